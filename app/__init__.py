@@ -1,6 +1,15 @@
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
 from flask import Flask
 
 
+def create_encode_pool(workers: int) -> ProcessPoolExecutor:
+    """Create the process pool used for CPU-bound figure encodes."""
+    start_method = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+    return ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context(start_method))
+
+
 def create_app():
     """
     Flask application factory.
@@ -15,4 +24,9 @@ def create_app():
     from app.routes import main_blueprint
     app.register_blueprint(main_blueprint)#, url_prefix='/easyfig')
 
+    # Process pool for large figure encodes; workers receive raw pixel bytes
+    workers = app.config.get('ENCODE_POOL_WORKERS', 0)
+    if workers:
+        app.extensions['encode_pool'] = create_encode_pool(workers)
+
     return app
\ No newline at end of file
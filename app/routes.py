@@ -1,12 +1,60 @@
-import base64
+import hashlib
 import io
 import json
+import math
+import mmap
 import os
+import struct
+from concurrent.futures.process import BrokenProcessPool
 from typing import Optional
 
-from flask import Blueprint, current_app, jsonify, render_template, request, send_file
+from flask import (
+    Blueprint,
+    Response,
+    current_app,
+    jsonify,
+    render_template,
+    request,
+    send_file,
+)
 from PIL import Image, UnidentifiedImageError
 
+from app import create_encode_pool
+
+try:
+    import orjson  # fast JSON serializer (optional)
+except ImportError:
+    orjson = None
+
+try:
+    import pybase64  # SIMD-accelerated base64 (optional)
+except ImportError:
+    pybase64 = None
+    import base64
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+try:
+    import numexpr as ne  # fused array expressions (optional)
+except ImportError:
+    ne = None
+
+try:
+    import numba  # JIT kernels for TIFF normalization (optional)
+except ImportError:
+    numba = None
+
+try:
+    # libjpeg-turbo bindings for the JPEG export path (optional)
+    from turbojpeg import TJPF_RGB, TJSAMP_420, TurboJPEG
+    _turbojpeg = TurboJPEG()
+except Exception:
+    # Module missing or libturbojpeg shared library not found
+    _turbojpeg = None
+
 main_blueprint = Blueprint('main', __name__)
 
 # Load journal rules once
@@ -14,6 +62,364 @@ JOURNAL_RULES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), '.
 with open(JOURNAL_RULES_PATH, 'r', encoding='utf-8') as f:
     JOURNAL_RULES = json.load(f)
 
+# The rules never change at runtime, so serialize them once and serve the bytes.
+# Keys are sorted to match jsonify, which fixes the journal order the frontend lists.
+if orjson is not None:
+    JOURNAL_RULES_BYTES = orjson.dumps(JOURNAL_RULES, option=orjson.OPT_SORT_KEYS)
+else:
+    JOURNAL_RULES_BYTES = json.dumps(JOURNAL_RULES, separators=(',', ':'), sort_keys=True).encode('utf-8')
+JOURNAL_RULES_ETAG = hashlib.md5(JOURNAL_RULES_BYTES, usedforsecurity=False).hexdigest()
+
+MIME_MAP = {'png': 'image/png', 'jpeg': 'image/jpeg', 'tiff': 'image/tiff', 'pdf': 'application/pdf'}
+ALLOWED_FORMATS = frozenset(MIME_MAP)
+# (default, min, max) for the export request parameters
+DPI_RANGE = (600, 50, 2400)
+JPEG_QUALITY_RANGE = (90, 40, 95)
+
+# zlib level for PNG output; `optimize` stays off since its extra passes cost far more than they save
+PNG_SAVE_OPTIONS = {'compress_level': 6, 'optimize': False}
+
+PNG_SIGNATURE = b'\x89PNG\r\n\x1a\n'
+
+# Modes that round-trip through Image.tobytes()/frombytes() without extra state (e.g. a palette)
+_POOL_MODES = frozenset({'L', 'LA', 'RGB', 'RGBA'})
+# Image.info entries the PNG/JPEG/TIFF/PDF writers read; forwarded to the pool with the pixels
+_POOL_INFO_KEYS = ('icc_profile', 'transparency', 'comment', 'default_image', 'compression')
+# Below this many pixels, shipping the image to the encode pool costs more than encoding it here
+_POOL_MIN_PIXELS = 1_000_000
+
+# Base64 characters decoded per step for data URLs (a multiple of 4)
+_B64_CHUNK = 256 * 1024
+
+# Elements per tile for the TIFF min/max and normalization passes (~1 MiB of float32, L2-sized)
+_TILE_ELEMENTS = 256 * 1024
+# Decoded TIFFs at least this large go to a temporary memory map instead of the heap
+_TIFF_MEMMAP_BYTES = 256 * 1024 * 1024
+
+# Modes PNG stores as-is (I;16 and I;16B become 16-bit grayscale), so TIFF conversion keeps them
+PNG_NATIVE_MODES = frozenset({'RGB', 'RGBA', 'L', 'LA', 'I;16', 'I;16B'})
+
+# Image.info entries parsed on open that no export format writes back
+_UNUSED_INFO_KEYS = ('exif', 'xmp', 'XML:com.adobe.xmp')
+
+
+def _json(obj, status: int = 200) -> Response:
+    """Build a JSON response, serialized with orjson when it is installed."""
+    if orjson is None:
+        resp = jsonify(obj)
+        resp.status_code = status
+        return resp
+    return Response(orjson.dumps(obj), status=status, mimetype='application/json')
+
+
+def _clamp_int(value, default: int, lo: int, hi: int) -> int:
+    """Coerce a request parameter to an int in ``lo..hi``, using ``default`` if it is not numeric.
+
+    Accepts ints, finite floats (truncated) and decimal strings without raising, so the
+    common valid request never constructs an exception.
+    """
+    if isinstance(value, str):
+        text = value.strip()
+        digits = text[1:] if text[:1] in ('+', '-') else text
+        if not digits.isdecimal():
+            value = default
+        elif len(digits.lstrip('0')) > 9:
+            # Far outside any range used here; saturate rather than hit int()'s digit limit
+            value = lo if text[:1] == '-' else hi
+        else:
+            value = int(text)
+    elif isinstance(value, float):
+        value = int(value) if math.isfinite(value) else default
+    elif not isinstance(value, int):
+        value = default
+    return max(lo, min(hi, value))
+
+
+def _b64encode(data) -> str:
+    """Base64-encode ``data`` straight to an ASCII str."""
+    if pybase64 is not None:
+        return pybase64.b64encode_as_string(data)
+    return base64.b64encode(data).decode('ascii')
+
+
+def _b64encode_buffer(buf: io.BytesIO) -> str:
+    """Base64-encode the contents of ``buf`` from its live buffer, skipping the getvalue() copy."""
+    with buf.getbuffer() as view:
+        return _b64encode(view)
+
+
+def _b64decode(encoded) -> bytes:
+    """Strictly decode a base64 str/bytes payload."""
+    if pybase64 is not None:
+        return pybase64.b64decode(encoded, validate=True)
+    return base64.b64decode(encoded, validate=True)
+
+
+def _png_dpi(stream) -> Optional[int]:
+    """Return the DPI in a PNG's pHYs chunk, or None if ``stream`` is not a PNG with one.
+
+    Only the chunk headers ahead of the image data are read; the stream position is restored.
+    """
+    start = stream.tell()
+    try:
+        if stream.read(8) != PNG_SIGNATURE:
+            return None
+        while True:
+            header = stream.read(8)
+            if len(header) < 8:
+                return None
+            length, chunk_type = struct.unpack('>I4s', header)
+            if chunk_type == b'pHYs':
+                body = stream.read(9)
+                if len(body) < 9:
+                    return None
+                ppm_x, ppm_y, unit = struct.unpack('>IIB', body)
+                # unit 1 = pixels per metre
+                if unit != 1 or ppm_x != ppm_y:
+                    return None
+                return round(ppm_x * 0.0254)
+            if chunk_type in (b'IDAT', b'IEND'):
+                # pHYs must precede the image data
+                return None
+            stream.seek(length + 4, io.SEEK_CUR)  # chunk data + CRC
+    finally:
+        stream.seek(start)
+
+
+def _decode_data_url(data_url: str) -> mmap.mmap:
+    """Decode the base64 payload of ``data_url`` into an anonymous mmap, rewound to 0.
+
+    The payload is decoded slice by slice straight from ``data_url``, so neither a copy
+    of the base64 text nor an intermediate bytes object of the whole image is created.
+    """
+    start = data_url.index(',') + 1
+    payload_len = len(data_url) - start
+    if payload_len == 0 or payload_len % 4:
+        raise ValueError('invalid base64 length')
+    padding = 2 if data_url.endswith('==') else 1 if data_url.endswith('=') else 0
+    buf = mmap.mmap(-1, payload_len // 4 * 3 - padding)
+    for pos in range(start, len(data_url), _B64_CHUNK):
+        buf.write(_b64decode(data_url[pos:pos + _B64_CHUNK]))
+    buf.seek(0)
+    return buf
+
+
+def _write_jfif(fp, jpeg: bytes, dpi: int) -> None:
+    """Write a libjpeg-turbo JPEG to ``fp``, stamping ``dpi`` into its JFIF APP0 density."""
+    view = memoryview(jpeg)
+    if bytes(view[6:11]) != b'JFIF\x00':
+        fp.write(view)
+        return
+    # SOI, APP0 marker/length, 'JFIF\0', version -> units (1 = dots per inch), Xdensity, Ydensity
+    fp.write(view[:13])
+    fp.write(struct.pack('>BHH', 1, dpi, dpi))
+    fp.write(view[18:])
+
+
+def _flatten_rgba(img: Image.Image) -> Image.Image:
+    """Flatten an RGBA image onto white for formats without an alpha channel.
+
+    ``img.info`` (notably the ICC profile) is carried over, as ``convert('RGB')`` does.
+    """
+    if np is None:
+        if img.getextrema()[3][0] == 255:
+            return img.convert('RGB')
+        flat = Image.new('RGB', img.size, 'white')
+        flat.paste(img, mask=img.getchannel('A'))
+    else:
+        a = np.asarray(img)
+        alpha = a[..., 3:4]
+        if alpha.min() == 255:
+            # Opaque canvas (the usual case): just drop the alpha channel
+            flat = Image.fromarray(np.ascontiguousarray(a[..., :3]), 'RGB')
+        else:
+            # rgb * alpha + white * (1 - alpha) in integer math; fits in uint16
+            alpha = alpha.astype(np.uint16)
+            rgb = a[..., :3] * alpha
+            rgb += (255 - alpha) * 255
+            rgb += 127
+            rgb //= 255
+            flat = Image.fromarray(rgb.astype(np.uint8), 'RGB')
+    flat.info = img.info.copy()
+    return flat
+
+
+def _save_image(img: Image.Image, fp, fmt: str, dpi: int, quality: int) -> None:
+    """Encode ``img`` into ``fp`` with the export settings for ``fmt``."""
+    if fmt == 'tiff':
+        img.save(fp, format='TIFF', dpi=(dpi, dpi), compression='tiff_lzw')
+    elif fmt == 'pdf':
+        img.save(fp, format='PDF', resolution=dpi)
+    elif fmt == 'jpeg':
+        if _turbojpeg is not None and img.mode == 'RGB':
+            jpeg = _turbojpeg.encode(
+                np.asarray(img), quality=quality, pixel_format=TJPF_RGB, jpeg_subsample=TJSAMP_420
+            )
+            _write_jfif(fp, jpeg, dpi)
+        else:
+            img.save(fp, format='JPEG', dpi=(dpi, dpi), quality=quality)
+    else:
+        img.save(fp, format='PNG', dpi=(dpi, dpi), **PNG_SAVE_OPTIONS)
+
+
+def _encode_image(mode: str, size: tuple, pixels: bytes, fmt: str, dpi: int, quality: int, info: dict) -> bytes:
+    """Rebuild an image from raw pixels and encode it as ``fmt``; runs in the encode pool.
+
+    Takes plain pixel bytes rather than an Image so the arguments pickle cheaply; ``info``
+    carries the ``_POOL_INFO_KEYS`` entries the encoders read from ``Image.info``.
+    """
+    img = Image.frombytes(mode, size, pixels)
+    img.info.update(info)
+    buf = io.BytesIO()
+    _save_image(img, buf, fmt, dpi, quality)
+    return buf.getvalue()
+
+
+if numba is not None:
+    @numba.njit(cache=True, fastmath=True)
+    def _scale_to_uint8_kernel(flat, lo, scale, out):
+        # Subtract, scale, clip and narrow in one loop, straight from the source dtype
+        for i in range(flat.size):
+            v = (flat[i] - lo) * scale
+            if v < 0.0:
+                v = 0.0
+            elif v > 255.0:
+                v = 255.0
+            out[i] = np.uint8(v)
+
+    @numba.njit(cache=True)
+    def _minmax_kernel(flat):
+        # One serial pass (no Numba threading layer, so safe under threaded workers);
+        # stops at the first NaN so it can propagate like ndarray.min/max
+        mn = flat[0]
+        mx = flat[0]
+        for i in range(flat.size):
+            v = flat[i]
+            if v != v:
+                return mn, mx, True
+            if v < mn:
+                mn = v
+            elif v > mx:
+                mx = v
+        return mn, mx, False
+
+
+def _minmax(a: 'np.ndarray') -> tuple:
+    """Return ``(a.min(), a.max())`` while reading ``a`` from memory only once."""
+    if a.size <= _TILE_ELEMENTS:
+        return a.min(), a.max()
+    if numba is not None and a.dtype.kind in 'uif' and a.flags.c_contiguous:
+        mn, mx, has_nan = _minmax_kernel(a.reshape(-1))
+        return (np.nan, np.nan) if has_nan else (mn, mx)
+    # Blockwise: the max() pass over each block is served from cache, not DRAM
+    flat = a.reshape(-1)
+    mn = mx = None
+    for start in range(0, flat.size, _TILE_ELEMENTS):
+        block = flat[start:start + _TILE_ELEMENTS]
+        block_mn = block.min()
+        block_mx = block.max()
+        mn = block_mn if mn is None else np.minimum(mn, block_mn)
+        mx = block_mx if mx is None else np.maximum(mx, block_mx)
+    return mn, mx
+
+
+def _to_uint8(a: 'np.ndarray') -> 'np.ndarray':
+    """Linearly rescale ``a`` onto 0..255 as uint8 (constant arrays become all zeros)."""
+    if a.dtype == np.uint8:
+        return a
+    use_kernel = numba is not None and a.dtype.kind in 'uif'
+    if use_kernel:
+        a = np.ascontiguousarray(a)
+    # Reduce in the source dtype; it is usually narrower than float32
+    mn, mx = _minmax(a)
+    mn = float(mn)
+    mx = float(mx)
+    if not (mx > mn):
+        return np.zeros(a.shape, dtype=np.uint8)
+    if use_kernel:
+        # Compiled (and cached on disk) once per dtype
+        out = np.empty(a.shape, dtype=np.uint8)
+        _scale_to_uint8_kernel(a.reshape(-1), mn, 255.0 / (mx - mn), out.reshape(-1))
+        return out
+    lo = np.float32(mn)
+    hi = np.float32(mx)
+    scale = np.float32(255.0 / (mx - mn))
+    out = np.empty(a.shape, dtype=np.uint8)
+    src = a.reshape(-1)
+    dst = out.reshape(-1)
+    # Work tile by tile so the float32 temporaries stay cache-sized instead of
+    # matching the (possibly memory-mapped, multi-GB) input
+    for start in range(0, src.size, _TILE_ELEMENTS):
+        tile = src[start:start + _TILE_ELEMENTS]
+        if ne is not None:
+            # Single fused pass: no subtract/multiply/clip temporaries
+            scaled = ne.evaluate(
+                'where(a < lo, 0, where(a > hi, 255, (a - lo) * scale))',
+                local_dict={'a': tile.astype(np.float32, copy=False), 'lo': lo, 'hi': hi, 'scale': scale},
+            )
+        else:
+            scaled = np.subtract(tile, lo, dtype=np.float32)
+            scaled *= scale
+            np.clip(scaled, 0, 255, out=scaled)
+        np.copyto(dst[start:start + _TILE_ELEMENTS], scaled, casting='unsafe')
+    return out
+
+
+def _replace_encode_pool(broken) -> None:
+    """Swap a broken encode pool for a fresh one of the configured size."""
+    if current_app.extensions.get('encode_pool') is broken:
+        current_app.extensions['encode_pool'] = create_encode_pool(current_app.config['ENCODE_POOL_WORKERS'])
+    broken.shutdown(wait=False)
+
+
+def _export_response(img: Image.Image, fmt: str, dpi: int, quality: int, pathway: str) -> Response:
+    """Encode ``img`` as ``fmt`` and return it as a download, or as base64 JSON with ``mode=json``."""
+    if img.mode == 'RGBA' and fmt in {'jpeg', 'tiff', 'pdf'}:
+        img = _flatten_rgba(img)
+
+    as_json = request.args.get('mode') == 'json'
+    pool = current_app.extensions.get('encode_pool')
+    offload = (
+        pool is not None
+        and img.mode in _POOL_MODES
+        and img.width * img.height >= _POOL_MIN_PIXELS
+        # TIFF sources carry tags (tag_v2) that the TIFF writer copies; keep those local
+        and not hasattr(img, 'tag_v2')
+    )
+    try:
+        if offload:
+            info = {key: img.info[key] for key in _POOL_INFO_KEYS if key in img.info}
+            args = (img.mode, img.size, img.tobytes(), fmt, dpi, quality, info)
+            try:
+                # Encode in a pool process so this worker does not hold the GIL meanwhile
+                encoded = pool.submit(_encode_image, *args).result()
+            except BrokenProcessPool:
+                # A worker died (e.g. OOM-killed); replace the pool and encode this one here
+                current_app.logger.exception('Encode pool broken; recreating it')
+                _replace_encode_pool(pool)
+                encoded = _encode_image(*args)
+            output_buffer = io.BytesIO(encoded)
+        else:
+            output_buffer = io.BytesIO()
+            _save_image(img, output_buffer, fmt, dpi, quality)
+    except Exception as e:
+        current_app.logger.exception(f'Pillow save failed ({pathway})')
+        return _json({'error': 'Export failed', 'details': f'save_failed:{e}'}, 500)
+
+    if as_json:
+        if offload:
+            # Wraps the pool's bytes as-is; getvalue() hands them back without copying
+            b64 = _b64encode(output_buffer.getvalue())
+        else:
+            b64 = _b64encode_buffer(output_buffer)
+        return _json({'ok': True, 'format': fmt, 'base64': b64})
+
+    output_buffer.seek(0)
+    resp = send_file(output_buffer, mimetype=MIME_MAP[fmt], as_attachment=True, download_name=f'figure.{fmt}')
+    resp.headers['Cache-Control'] = 'no-transform'
+    return resp
+
+
 @main_blueprint.route('/')
 def index():
     return render_template('index.html')
@@ -49,14 +455,17 @@ def contact():
 
 @main_blueprint.route('/api/journal-rules')
 def get_journal_rules():
-    return jsonify(JOURNAL_RULES)
+    resp = Response(JOURNAL_RULES_BYTES, mimetype='application/json')
+    resp.set_etag(JOURNAL_RULES_ETAG)
+    resp.headers['Cache-Control'] = 'public, max-age=3600'
+    # Answers If-None-Match with a 304 when the client copy is current
+    return resp.make_conditional(request)
 
 @main_blueprint.route('/api/export-<format>', methods=['POST'])
 def export_figure(format):
     fmt = format.lower().replace('jpg', 'jpeg')
-    allowed = {'png', 'jpeg', 'tiff', 'pdf'}
-    if fmt not in allowed:
-        return jsonify({'error': 'Export failed', 'details': f'unsupported format: {fmt}'}), 400
+    if fmt not in ALLOWED_FORMATS:
+        return _json({'error': 'Export failed', 'details': f'unsupported format: {fmt}'}, 400)
 
     content_type = (request.content_type or '').lower()
 
@@ -64,116 +473,76 @@ def export_figure(format):
     if content_type.startswith('multipart/form-data'):
         try:
             upload = request.files.get('image')
-            mime_map = { 'png': 'image/png', 'jpeg': 'image/jpeg', 'tiff': 'image/tiff', 'pdf': 'application/pdf' }
             if not upload:
-                return jsonify({'error': 'Export failed', 'details': 'missing_file'}), 400
-            try:
-                img = Image.open(upload.stream)
-                img.load()
-            except UnidentifiedImageError:
-                return jsonify({'error': 'Export failed', 'details': 'unidentified_image'}), 400
-            except Exception as e:
-                return jsonify({'error': 'Export failed', 'details': f'image_open:{e}'}), 400
-
-            try:
-                dpi = int(request.form.get('dpi', '600'))
-            except ValueError:
-                dpi = 600
-            dpi = max(50, min(2400, dpi))
+                return _json({'error': 'Export failed', 'details': 'missing_file'}, 400)
+            dpi = _clamp_int(request.form.get('dpi'), *DPI_RANGE)
             quality = 90
             if fmt == 'jpeg':
-                try:
-                    quality = int(request.form.get('quality', '90'))
-                except ValueError:
-                    quality = 90
-                quality = max(40, min(95, quality))
+                quality = _clamp_int(request.form.get('quality'), *JPEG_QUALITY_RANGE)
 
-            if img.mode == 'RGBA' and fmt in {'jpeg', 'tiff', 'pdf'}:
-                img = img.convert('RGB')
+            if fmt == 'png' and _png_dpi(upload.stream) == dpi:
+                # Already a PNG at the requested DPI: skip the decode/encode round trip
+                raw = upload.stream.read()
+                try:
+                    # Walk the chunks and check their CRCs (IDAT is not inflated)
+                    Image.open(io.BytesIO(raw)).verify()
+                except UnidentifiedImageError:
+                    return _json({'error': 'Export failed', 'details': 'unidentified_image'}, 400)
+                except Exception as e:
+                    return _json({'error': 'Export failed', 'details': f'image_open:{e}'}, 400)
+                if request.args.get('mode') == 'json':
+                    return _json({'ok': True, 'format': fmt, 'base64': _b64encode(raw)})
+                resp = send_file(io.BytesIO(raw), mimetype=MIME_MAP['png'], as_attachment=True, download_name='figure.png')
+                resp.headers['Cache-Control'] = 'no-transform'
+                return resp
 
-            output_buffer = io.BytesIO()
             try:
-                if fmt == 'tiff':
-                    img.save(output_buffer, format='TIFF', dpi=(dpi, dpi), compression='tiff_lzw')
-                elif fmt == 'pdf':
-                    img.save(output_buffer, format='PDF', resolution=dpi)
-                elif fmt == 'jpeg':
-                    img.save(output_buffer, format='JPEG', dpi=(dpi, dpi), quality=quality)
-                else:
-                    img.save(output_buffer, format='PNG', dpi=(dpi, dpi))
+                img = Image.open(upload.stream)
+                # Metadata the export never writes back; release the raw blocks early.
+                # (icc_profile is kept: Pillow re-embeds it in PNG/TIFF output.)
+                for key in _UNUSED_INFO_KEYS:
+                    img.info.pop(key, None)
+                img.load()
+            except UnidentifiedImageError:
+                return _json({'error': 'Export failed', 'details': 'unidentified_image'}, 400)
             except Exception as e:
-                current_app.logger.exception('Pillow save failed (multipart)')
-                return jsonify({'error': 'Export failed', 'details': f'save_failed:{e}'}), 500
-
-            output_buffer.seek(0)
-            if request.args.get('mode') == 'json':
-                b64 = base64.b64encode(output_buffer.getvalue()).decode('ascii')
-                return jsonify({'ok': True, 'format': fmt, 'base64': b64})
+                return _json({'error': 'Export failed', 'details': f'image_open:{e}'}, 400)
 
-            resp = send_file(output_buffer, mimetype=mime_map[fmt], as_attachment=True, download_name=f'figure.{fmt}')
-            resp.headers['Cache-Control'] = 'no-transform'
-            return resp
+            return _export_response(img, fmt, dpi, quality, 'multipart')
         except Exception:
             current_app.logger.exception('Unhandled multipart export error')
-            return jsonify({'error': 'Export failed', 'details': 'multipart_unhandled'}), 500
+            return _json({'error': 'Export failed', 'details': 'multipart_unhandled'}, 500)
 
     # Legacy JSON base64 pathway
     try:
-        data = request.get_json(force=True, silent=False) or {}
+        if orjson is not None:
+            # The body is one multi-MB base64 string; orjson scans it far faster than json
+            data = orjson.loads(request.get_data(cache=False)) or {}
+        else:
+            data = request.get_json(force=True, silent=False) or {}
     except Exception as e:
-        return jsonify({'error': 'Export failed', 'details': f'bad_json:{e}'}), 400
+        return _json({'error': 'Export failed', 'details': f'bad_json:{e}'}, 400)
 
     canvas_data_url = data.get('canvasDataUrl')
     if not canvas_data_url or ',' not in canvas_data_url:
-        return jsonify({'error': 'Export failed', 'details': 'missing_or_invalid_canvasDataUrl'}), 400
+        return _json({'error': 'Export failed', 'details': 'missing_or_invalid_canvasDataUrl'}, 400)
 
     try:
-        header, encoded = canvas_data_url.split(',', 1)
-        image_data = base64.b64decode(encoded)
+        image_stream = _decode_data_url(canvas_data_url)
     except Exception as e:
-        return jsonify({'error': 'Export failed', 'details': f'base64_decode:{e}'}), 400
+        return _json({'error': 'Export failed', 'details': f'base64_decode:{e}'}, 400)
 
-    image_stream = io.BytesIO(image_data)
     try:
         img = Image.open(image_stream)
         img.load()
     except UnidentifiedImageError:
-        return jsonify({'error': 'Export failed', 'details': 'unidentified_image'}), 400
-    except Exception as e:
-        return jsonify({'error': 'Export failed', 'details': f'image_open:{e}'}), 400
-
-    try:
-        dpi = int(data.get('dpi', 600))
-    except (ValueError, TypeError):
-        dpi = 600
-    dpi = max(50, min(2400, dpi))
-
-    if img.mode == 'RGBA' and fmt in {'jpeg', 'tiff', 'pdf'}:
-        img = img.convert('RGB')
-
-    output_buffer = io.BytesIO()
-    try:
-        if fmt == 'tiff':
-            img.save(output_buffer, format='TIFF', dpi=(dpi, dpi), compression='tiff_lzw')
-        elif fmt == 'pdf':
-            img.save(output_buffer, format='PDF', resolution=dpi)
-        elif fmt == 'jpeg':
-            img.save(output_buffer, format='JPEG', dpi=(dpi, dpi), quality=95)
-        else:
-            img.save(output_buffer, format='PNG', dpi=(dpi, dpi))
+        return _json({'error': 'Export failed', 'details': 'unidentified_image'}, 400)
     except Exception as e:
-        current_app.logger.exception('Pillow save failed (legacy)')
-        return jsonify({'error': 'Export failed', 'details': f'save_failed:{e}'}), 500
+        return _json({'error': 'Export failed', 'details': f'image_open:{e}'}, 400)
 
-    output_buffer.seek(0)
-    if request.args.get('mode') == 'json':
-        b64 = base64.b64encode(output_buffer.getvalue()).decode('ascii')
-        return jsonify({'ok': True, 'format': fmt, 'base64': b64})
+    dpi = _clamp_int(data.get('dpi'), *DPI_RANGE)
 
-    mime_map = { 'png': 'image/png', 'jpeg': 'image/jpeg', 'tiff': 'image/tiff', 'pdf': 'application/pdf' }
-    resp = send_file(output_buffer, mimetype=mime_map[fmt], as_attachment=True, download_name=f'figure.{fmt}')
-    resp.headers['Cache-Control'] = 'no-transform'
-    return resp
+    return _export_response(img, fmt, dpi, 95, 'legacy')
 
 @main_blueprint.route('/api/submit-feedback', methods=['POST'])
 def submit_feedback():
@@ -182,9 +551,9 @@ def submit_feedback():
         rating = data.get('rating')
         _ = data.get('feedback', '')  # feedback text (unused storage)
         current_app.logger.info(f"Feedback received rating={rating}")
-        return jsonify({'success': True})
+        return _json({'success': True})
     except Exception as e:
-        return jsonify({'error': 'Failed to submit feedback', 'details': str(e)}), 500
+        return _json({'error': 'Failed to submit feedback', 'details': str(e)}, 500)
 
 
 @main_blueprint.route('/api/convert-tiff', methods=['POST'])
@@ -197,11 +566,20 @@ def convert_tiff_to_png():
     try:
         upload = request.files.get('image')
         if not upload:
-            return jsonify({'error': 'missing_file'}), 400
+            return _json({'error': 'missing_file'}, 400)
+
+        # Read smaller uploads once so both decoders below work from memory. Large ones
+        # stay in Werkzeug's spooled temp file, keeping multi-GB BigTIFFs off the heap.
+        source = upload.stream
+        source.seek(0, os.SEEK_END)
+        if source.tell() < _TIFF_MEMMAP_BYTES:
+            source.seek(0)
+            source = io.BytesIO(source.read())
 
         # First attempt: Pillow (covers many TIFF variants, including BigTIFF)
         try:
-            img = Image.open(upload.stream)
+            source.seek(0)
+            img = Image.open(source)
             try:
                 # Use the first frame if multi-page
                 if getattr(img, 'n_frames', 1) > 1:
@@ -210,15 +588,14 @@ def convert_tiff_to_png():
                 pass
 
             # Normalize modes to ensure PNG compatibility
-            if img.mode not in {'RGB', 'RGBA'}:
-                # Convert everything to RGB to avoid mode pitfalls (e.g., I;16, F)
+            if img.mode not in PNG_NATIVE_MODES:
+                # Convert the rest to RGB to avoid mode pitfalls (e.g., I;32, F, CMYK)
                 img = img.convert('RGB')
 
             out = io.BytesIO()
-            img.save(out, format='PNG')
-            out.seek(0)
-            b64 = base64.b64encode(out.getvalue()).decode('ascii')
-            return jsonify({'ok': True, 'format': 'png', 'base64': b64})
+            img.save(out, format='PNG', **PNG_SAVE_OPTIONS)
+            b64 = _b64encode_buffer(out)
+            return _json({'ok': True, 'format': 'png', 'base64': b64})
         except UnidentifiedImageError:
             # Explicitly fall through to tifffile
             pass
@@ -228,30 +605,24 @@ def convert_tiff_to_png():
 
         # Second attempt: tifffile (optional dependency for broader support)
         try:
-            import numpy as np  # type: ignore
             import tifffile as tiff  # type: ignore
+            if np is None:
+                raise ImportError('numpy is not installed')
         except Exception:
             current_app.logger.exception('tifffile or numpy not available for TIFF conversion fallback')
-            return jsonify({'error': 'tiff_decode_failed', 'details': 'server_missing_tifffile'}), 500
+            return _json({'error': 'tiff_decode_failed', 'details': 'server_missing_tifffile'}, 500)
 
         try:
-            upload.stream.seek(0)
-            with tiff.TiffFile(upload.stream) as tf:
-                arr = tf.asarray()
-
-            # Convert to uint8 RGB/L
-            def to_uint8(a: 'np.ndarray') -> 'np.ndarray':
-                if a.dtype == np.uint8:
-                    return a
-                a = a.astype(np.float32, copy=False)
-                mn = float(a.min())
-                mx = float(a.max())
-                if not (mx > mn):
-                    return np.zeros_like(a, dtype=np.uint8)
-                scaled = (a - mn) * (255.0 / (mx - mn))
-                return np.clip(scaled, 0, 255).astype(np.uint8)
-
-            arr = to_uint8(arr)
+            source.seek(0)
+            # Name the stream explicitly: a spooled temp file's .name is its fd, not a path
+            with tiff.TiffFile(source, name=upload.filename or 'upload.tif') as tf:
+                # Large (e.g. BigTIFF) images decode into a temp-file memmap rather than RAM
+                decode_to = 'memmap' if tf.series[0].nbytes >= _TIFF_MEMMAP_BYTES else None
+                arr = tf.asarray(out=decode_to)
+            # Release the in-memory copy of the upload before normalizing
+            source = img = None
+
+            arr = _to_uint8(arr)
             mode: Optional[str] = None
             if arr.ndim == 2:
                 mode = 'L'
@@ -270,16 +641,15 @@ def convert_tiff_to_png():
                     mode = 'L'
 
             pil_img = Image.fromarray(arr, mode=mode)
-            if pil_img.mode not in {'RGB', 'RGBA'}:
+            if pil_img.mode not in PNG_NATIVE_MODES:
                 pil_img = pil_img.convert('RGB')
             out = io.BytesIO()
-            pil_img.save(out, format='PNG')
-            out.seek(0)
-            b64 = base64.b64encode(out.getvalue()).decode('ascii')
-            return jsonify({'ok': True, 'format': 'png', 'base64': b64})
+            pil_img.save(out, format='PNG', **PNG_SAVE_OPTIONS)
+            b64 = _b64encode_buffer(out)
+            return _json({'ok': True, 'format': 'png', 'base64': b64})
         except Exception:
             current_app.logger.exception('TIFF conversion failed (tifffile fallback)')
-            return jsonify({'error': 'tiff_decode_failed'}), 500
+            return _json({'error': 'tiff_decode_failed'}, 500)
     except Exception:
         current_app.logger.exception('Unhandled convert-tiff error')
-        return jsonify({'error': 'unhandled'}), 500
\ No newline at end of file
+        return _json({'error': 'unhandled'}, 500)
\ No newline at end of file
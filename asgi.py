@@ -0,0 +1,11 @@
+from a2wsgi import WSGIMiddleware
+
+from app import create_app
+
+app = create_app()
+
+# ASGI entry point, e.g. `uvicorn asgi:application`.
+# a2wsgi runs each request on its own pool of ASGI_WORKER_THREADS threads, so a
+# long Pillow decode/encode (which releases the GIL) runs alongside other requests
+# instead of blocking the event loop.
+application = WSGIMiddleware(app, workers=app.config['ASGI_WORKER_THREADS'])
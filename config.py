@@ -1 +1,7 @@
- 
\ No newline at end of file
+# Worker processes for CPU-bound export encodes (0 = encode in the request thread).
+# The pool is created per app instance, i.e. per gunicorn worker process, so size it
+# as roughly CPU count / number of gunicorn workers.
+ENCODE_POOL_WORKERS = 0
+
+# Request threads for the ASGI entry point (asgi.py)
+ASGI_WORKER_THREADS = 8